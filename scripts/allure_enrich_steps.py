@@ -8,17 +8,24 @@ only uses our enriched results (with steps).
 On failure: Maestro's JUnit <failure>/<error> message and body are captured
 and attached as statusDetails on the test and on the last step (failed step).
 Usage: run from repo root after regression.sh (which produces *_report.xml).
+Optional: orjson writes results when installed; stdlib json otherwise.
+Set ALLURE_PRETTY=1 to write indented result JSON (compact by default).
 """
 
+import functools
 import json
 import os
 import re
 import shutil
 import time
-import uuid
 import xml.etree.ElementTree as ET
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional: faster serializer, stdlib json otherwise
+    orjson = None
+
 ROOT = Path(__file__).resolve().parent.parent
 RESULTS_DIR = ROOT / "allure-results"
 FLOWS_DIR = ROOT / ".maestro" / "flows"
@@ -37,26 +44,72 @@ REPORT_TO_MAESTRO_DIR = {
     "profile_report": "maestro-profile",
 }
 
+# ALLURE_PRETTY=1 indents *-result.json for debugging; Allure reads compact JSON fine
+PRETTY_JSON = os.environ.get("ALLURE_PRETTY") == "1"
+
 IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tiff", ".webp")
 IMAGE_MIME = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".gif": "image/gif", ".bmp": "image/bmp", ".tiff": "image/tiff", ".webp": "image/webp"}
 
+# Flow YAML patterns, compiled once (steps_from_flow_yaml runs them on every line)
+_RE_CMD = re.compile(r"^\s*-\s+(\w+)\s*:\s*(.*)$")
+_RE_SUBFLOW = re.compile(r"file:\s*\.\./subflows/(\S+)")
+_RE_ID = re.compile(r"id:\s*[\"']?([^\"'\s]+)")
+# One pass for both selectors: group 1 = id, group 2 = text
+_RE_ID_OR_TEXT = re.compile(r"(?:id:\s*[\"']?([^\"'\s]+))|(?:text:\s*[\"']?([^\"'\n]+))")
+
+# Maestro screenshot name, e.g. "screenshot-❌-1718105042591-(flow.yaml).png" (epoch ms)
+_RE_MAESTRO_TS = re.compile(r"^screenshot-[^-]+-(\d{13})-\(.+\)\.\w+$")
+
+# Quoted id/text in Maestro failure messages
+_RE_QUOTED = re.compile(r'"([^"]+)"')
+
+
+def _uid24() -> str:
+    """24 random hex chars for Allure result/attachment uuids."""
+    return os.urandom(12).hex()
 
-def find_latest_screenshot(maestro_dir: Path) -> Path | None:
-    """Return path to the most recently modified image in maestro_dir (or subdirs), or None."""
-    if not maestro_dir.exists():
+
+def _dump(obj) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes (orjson when installed); compact unless PRETTY_JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if PRETTY_JSON else None)
+    if PRETTY_JSON:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def find_latest_screenshot(maestro_dir: str | Path) -> Path | None:
+    """
+    Return path to the newest image in maestro_dir (or subdirs), or None.
+    Newest = largest epoch ms in the name when every image uses Maestro's screenshot
+    naming (and one stamp is strictly largest); otherwise the latest mtime.
+    """
+    if not os.path.isdir(maestro_dir):
+        return None
+    candidates = []
+    # scandir walk: DirEntry caches type/stat info, so no Path per entry and no extra stat per file
+    stack = [str(maestro_dir)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                    candidates.append(entry)
+    if not candidates:
         return None
-    latest = None
-    latest_mtime = 0
-    for f in maestro_dir.rglob("*"):
-        if f.is_file() and f.suffix.lower() in IMAGE_EXTENSIONS:
-            m = f.stat().st_mtime
-            if m > latest_mtime:
-                latest_mtime = m
-                latest = f
-    return latest
-
-
-def copy_screenshot_to_allure(maestro_dir: Path, attachment_uuid: str) -> tuple[str, str] | None:
+    # When every name is in Maestro's format, its epoch ms orders them without a stat per file
+    stamps = [_RE_MAESTRO_TS.match(entry.name) for entry in candidates]
+    if all(stamps):
+        millis = [int(stamp.group(1)) for stamp in stamps]
+        newest = max(millis)
+        if millis.count(newest) == 1:
+            return Path(candidates[millis.index(newest)].path)
+    latest = max(candidates, key=lambda entry: entry.stat().st_mtime)
+    return Path(latest.path)
+
+
+def copy_screenshot_to_allure(maestro_dir: str | Path, attachment_uuid: str) -> tuple[str, str] | None:
     """
     Copy latest screenshot from maestro_dir to allure-results as <uuid>-attachment.<ext>.
     Returns (source_filename, mime_type) for Allure attachment, or None.
@@ -67,33 +120,45 @@ def copy_screenshot_to_allure(maestro_dir: Path, attachment_uuid: str) -> tuple[
     ext = src.suffix.lower()
     mime = IMAGE_MIME.get(ext, "image/png")
     dest = RESULTS_DIR / f"{attachment_uuid}-attachment{ext}"
-    shutil.copy2(src, dest)
+    shutil.copyfile(src, dest)  # contents only: attachment needs no metadata
     return (dest.name, mime)
 
 
-def steps_from_flow_yaml(flow_path: Path) -> list[str]:
-    """Parse Maestro flow YAML and return a list of step names (one per command)."""
-    if not flow_path.exists():
-        return []
-    lines = flow_path.read_text(encoding="utf-8").splitlines()
+def _selector(line: str) -> str | None:
+    """Selector in line, id preferred over text (even when text comes first); None if neither."""
+    sel = _RE_ID_OR_TEXT.search(line)
+    if sel is None or sel.group(1):
+        return sel and sel.group(1)
+    id_match = _RE_ID.search(line, sel.start())
+    return id_match.group(1) if id_match else sel.group(2).strip()
+
+
+@functools.lru_cache(maxsize=None)
+def steps_from_flow_yaml(flow_path_str: str) -> tuple[str, ...]:
+    """Parse Maestro flow YAML and return step names (one per command). Cached per flow path."""
+    if not os.path.exists(flow_path_str):
+        return ()
+    # One unbuffered read of the whole file, decoded once
+    with open(flow_path_str, "rb", buffering=0) as fh:
+        lines = fh.read().decode("utf-8", "replace").splitlines()
     steps = []
     in_steps = False
     i = 0
     while i < len(lines):
         line = lines[i]
         i += 1
-        line_stripped = line.rstrip()
-        if line_stripped.strip() == "---":
+        s = line.strip()
+        if s == "---":
             in_steps = True
             continue
         if not in_steps:
             continue
         # Comment line: use as step description
-        if line_stripped.strip().startswith("#") and line_stripped.strip() != "#":
-            steps.append(line_stripped.strip().lstrip("#").strip() or "Comment")
+        if s.startswith("#") and s != "#":
+            steps.append(s.lstrip("#").strip() or "Comment")
             continue
-        # Maestro command: "- commandName:" or "- commandName: value"
-        m = re.match(r"^\s*-\s+(\w+)\s*:\s*(.*)$", line_stripped)
+        # Maestro command: "- commandName:" or "- commandName: value" (rest is stripped below)
+        m = _RE_CMD.match(line)
         if m:
             cmd, rest = m.group(1), m.group(2).strip()
             if cmd == "runFlow":
@@ -101,7 +166,7 @@ def steps_from_flow_yaml(flow_path: Path) -> list[str]:
                 subname = "subflow"
                 j = i
                 while j < len(lines) and lines[j].startswith((" ", "\t")):
-                    sub = re.search(r"file:\s*\.\./subflows/(\S+)", lines[j])
+                    sub = _RE_SUBFLOW.search(lines[j])
                     if sub:
                         subname = sub.group(1).replace(".yaml", "")
                         break
@@ -112,7 +177,7 @@ def steps_from_flow_yaml(flow_path: Path) -> list[str]:
             elif cmd == "tapOn":
                 detail = rest or ""
                 if "id:" in detail:
-                    id_match = re.search(r"id:\s*[\"']?([^\"'\s]+)", detail)
+                    id_match = _RE_ID.search(detail)
                     detail = id_match.group(1) if id_match else detail
                 steps.append(f"Tap: {detail}" if detail else "Tap")
             elif cmd == "assertVisible":
@@ -120,24 +185,19 @@ def steps_from_flow_yaml(flow_path: Path) -> list[str]:
                 if not detail and i < len(lines):
                     # Multi-line: next lines have id: or text:
                     for j in range(i, min(i + 5, len(lines))):
-                        if re.search(r"id:\s*[\"']?([^\"'\s]+)", lines[j]):
-                            id_match = re.search(r"id:\s*[\"']?([^\"'\s]+)", lines[j])
-                            detail = id_match.group(1) if id_match else ""
+                        found = _selector(lines[j])
+                        if found is not None:
+                            detail = found.strip('"')
                             break
                         if "text:" in lines[j]:
-                            text_match = re.search(r"text:\s*[\"']?([^\"'\n]+)", lines[j])
-                            detail = (text_match.group(1).strip() if text_match else "").strip('"')
-                            break
-                if "id:" in detail:
-                    id_match = re.search(r"id:\s*[\"']?([^\"'\s]+)", detail)
-                    detail = id_match.group(1) if id_match else detail
-                elif "text:" in detail:
-                    text_match = re.search(r"text:\s*[\"']?([^\"'\n]+)", detail)
-                    detail = text_match.group(1).strip() if text_match else detail
+                            break  # "text:" without a parseable value still ends the lookahead
+                found = _selector(detail)
+                if found is not None:
+                    detail = found
                 steps.append(f"Assert visible: {detail}" if detail else "Assert visible")
             else:
                 steps.append(cmd + (f" ({rest})" if rest else ""))
-    return steps
+    return tuple(steps)
 
 
 def junit_to_allure_results():
@@ -145,39 +205,48 @@ def junit_to_allure_results():
     RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 
     # 1) Collect all test cases in execution order (so total duration = sum of all)
+    # Plain string paths in the per-report/per-case loops: skips pathlib's per-join overhead
+    results_dir = str(RESULTS_DIR)
+    flows_dir = str(FLOWS_DIR)
     cases = []
     for report_name, flow_name in REPORT_TO_FLOW_ORDER:
-        xml_path = RESULTS_DIR / f"{report_name}.xml"
-        if not xml_path.exists():
+        xml_path = os.path.join(results_dir, f"{report_name}.xml")
+        if not os.path.exists(xml_path):
             continue
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
-        suites = root.findall(".//testsuite") if root.tag == "testsuites" else [root]
-        for suite in suites:
-            for tc in suite.findall("testcase"):
-                name = tc.get("name") or tc.get("id") or "Unnamed"
-                # JUnit: failure is often indicated by <failure>/<error> child, not always by status attribute
-                status_details = None
-                for tag in ("failure", "error"):
-                    node = tc.find(tag)
-                    if node is not None:
-                        msg = (node.get("message") or "").strip()
-                        body = (node.text or "").strip()
-                        status_details = {"message": msg or body or "Test failed", "trace": body if body != msg else ""}
-                        break
-                has_failure_node = status_details is not None
-                status = (tc.get("status") or "SUCCESS").lower()
-                if status == "success":
-                    status = "passed"
-                elif status == "failure":
-                    status = "failed"
-                elif has_failure_node:
-                    status = "failed"  # Maestro may only write <failure> without status attribute
-                else:
-                    status = "passed"
-                time_sec = float(tc.get("time", 0))
-                cases.append((report_name, flow_name, name, status, time_sec, status_details))
-        xml_path.unlink()
+        # Stream testcases as they close (works for <testsuites> and bare <testsuite> roots alike).
+        # Open elements are tracked so each finished testcase can be detached from its suite.
+        open_elems = []
+        for event, tc in ET.iterparse(xml_path, events=("start", "end")):
+            if event == "start":
+                open_elems.append(tc)
+                continue
+            open_elems.pop()
+            if tc.tag != "testcase":
+                continue
+            name = tc.get("name") or tc.get("id") or "Unnamed"
+            # JUnit: failure is often indicated by <failure>/<error> child, not always by status attribute
+            status_details = None
+            for child in tc:
+                if child.tag in ("failure", "error"):
+                    msg = (child.get("message") or "").strip()
+                    body = (child.text or "").strip()
+                    status_details = {"message": msg or body or "Test failed", "trace": body if body != msg else ""}
+                    break
+            has_failure_node = status_details is not None
+            status = (tc.get("status") or "SUCCESS").lower()
+            if status == "success":
+                status = "passed"
+            elif status == "failure":
+                status = "failed"
+            elif has_failure_node:
+                status = "failed"  # Maestro may only write <failure> without status attribute
+            else:
+                status = "passed"
+            time_sec = float(tc.get("time", 0))
+            cases.append((report_name, flow_name, name, status, time_sec, status_details))
+            if open_elems:
+                open_elems[-1].remove(tc)  # parent drops it, so memory stays at one testcase
+        os.unlink(xml_path)
 
     if not cases:
         return
@@ -188,14 +257,13 @@ def junit_to_allure_results():
     base_start_ms = now_ms - int(total_sec * 1000)
 
     for report_name, flow_name, name, status, time_sec, status_details in cases:
-        flow_path = FLOWS_DIR / flow_name
-        step_names = steps_from_flow_yaml(flow_path)
+        step_names = steps_from_flow_yaml(os.path.join(flows_dir, flow_name))
 
         start_ms = base_start_ms
         stop_ms = base_start_ms + int(time_sec * 1000)
         base_start_ms = stop_ms
 
-        uid = str(uuid.uuid4()).replace("-", "")[:24]
+        uid = _uid24()
         history_id = f"Test Suite:{name}#{name}"
         full_name = f"Test Suite:{name}"
 
@@ -205,20 +273,23 @@ def junit_to_allure_results():
         if status == "failed" and status_details:
             msg = (status_details.get("message") or "") + " " + (status_details.get("trace") or "")
             # Maestro: "Assertion is false: \"coverage-percentage--xyz\" is visible" -> match step with that id/text
-            for part in re.findall(r'"([^"]+)"', msg):
-                if len(part) > 2:
-                    for idx, step_name in enumerate(step_names):
-                        if part in step_name:
-                            failed_step_index = idx
-                            break
-                    else:
-                        continue
+            found = False
+            for quoted in _RE_QUOTED.finditer(msg):
+                part = quoted.group(1)
+                if len(part) <= 2:
+                    continue
+                for idx, step_name in enumerate(step_names):
+                    if part in step_name:
+                        failed_step_index = idx
+                        found = True
+                        break
+                if found:
                     break
 
         step_objects = []
         step_duration_ms = int(time_sec * 1000 / max(len(step_names), 1))
+        s_start = start_ms
         for i, step_name in enumerate(step_names):
-            s_start = start_ms + i * step_duration_ms
             s_stop = s_start + step_duration_ms
             if status != "failed":
                 step_status = "passed"
@@ -232,6 +303,7 @@ def junit_to_allure_results():
             if status == "failed" and i == failed_step_index and status_details:
                 step_payload["statusDetails"] = status_details
             step_objects.append(step_payload)
+            s_start = s_stop
 
         result = {
             "uuid": uid,
@@ -252,8 +324,8 @@ def junit_to_allure_results():
             result["statusDetails"] = status_details
         # On failure: attach Maestro screenshot from flow's test-output dir
         if status == "failed" and report_name in REPORT_TO_MAESTRO_DIR:
-            maestro_dir = RESULTS_DIR / REPORT_TO_MAESTRO_DIR[report_name]
-            att_uuid = str(uuid.uuid4()).replace("-", "")[:24]
+            maestro_dir = os.path.join(results_dir, REPORT_TO_MAESTRO_DIR[report_name])
+            att_uuid = _uid24()
             attachment_info = copy_screenshot_to_allure(maestro_dir, att_uuid)
             if attachment_info:
                 source_name, mime_type = attachment_info
@@ -261,8 +333,8 @@ def junit_to_allure_results():
                 result["attachments"] = [att]
                 if failed_step_index < len(step_objects):
                     step_objects[failed_step_index]["attachments"] = [att]
-        out_path = RESULTS_DIR / f"{uid}-result.json"
-        out_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        with open(os.path.join(results_dir, f"{uid}-result.json"), "wb") as fh:
+            fh.write(_dump(result))
 
 
 if __name__ == "__main__":
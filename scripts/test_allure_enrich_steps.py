@@ -0,0 +1,79 @@
+"""
+Unit tests for allure_enrich_steps.
+Usage: python -m unittest discover -s scripts
+"""
+
+import os
+import tempfile
+import unittest
+
+import allure_enrich_steps as enrich
+
+
+def flow_steps(body: str) -> list[str]:
+    """Write a flow (header + body) to a temp file and return its parsed steps."""
+    with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False, encoding="utf-8") as fh:
+        fh.write("appId: com.example\n---\n" + body)
+    try:
+        return list(enrich.steps_from_flow_yaml(fh.name))
+    finally:
+        os.unlink(fh.name)
+
+
+class StepsFromFlowYamlTest(unittest.TestCase):
+    # Regression guards: the lookahead must neither duplicate a step nor drop in-block comments
+    def test_multiline_assert_visible_is_one_step(self):
+        steps = flow_steps('- assertVisible:\n    text: "Hello"\n    text: "again"\n')
+        self.assertEqual(steps, ["Assert visible: Hello"])
+
+    def test_comments_inside_blocks_are_kept(self):
+        body = (
+            "- runFlow:\n"
+            "    # sign in first\n"
+            "    file: ../subflows/auth.yaml\n"
+            "- assertVisible:\n"
+            "    # wait for header\n"
+            '    id: "hdr"\n'
+        )
+        self.assertEqual(
+            flow_steps(body),
+            ["Run flow: auth", "sign in first", "Assert visible: hdr", "wait for header"],
+        )
+
+    def test_id_preferred_over_text(self):
+        body = '- tapOn: {text: "Login", id: "btn-login"}\n- assertVisible: {text: "Hi", id: "hdr"}\n'
+        self.assertEqual(flow_steps(body), ["Tap: btn-login", "Assert visible: hdr"])
+
+    def test_empty_text_line_ends_assert_visible_lookahead(self):
+        body = '- assertVisible:\n    text:\n      "Welcome back"\n- tapOn:\n    id: "login"\n'
+        self.assertEqual(flow_steps(body), ["Assert visible", "Tap"])
+
+
+class FindLatestScreenshotTest(unittest.TestCase):
+    def make_images(self, tmp: str, names_mtimes: dict[str, int]) -> None:
+        for name, mtime in names_mtimes.items():
+            path = os.path.join(tmp, name)
+            open(path, "wb").close()
+            os.utime(path, (mtime, mtime))
+
+    def test_non_maestro_names_use_mtime(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.make_images(tmp, {"20240101_170000.png": 2000, "20240101_090000.png": 1000})
+            self.assertEqual(enrich.find_latest_screenshot(tmp).name, "20240101_170000.png")
+
+    def test_maestro_names_use_embedded_epoch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            older = "screenshot-❌-1718105042000-(flow.yaml).png"
+            newer = "screenshot-❌-1718105042591-(flow.yaml).png"
+            # mtimes deliberately disagree: the name timestamp wins for Maestro's format
+            self.make_images(tmp, {older: 2000, newer: 1000})
+            self.assertEqual(enrich.find_latest_screenshot(tmp).name, newer)
+
+    def test_mixed_names_use_mtime(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.make_images(tmp, {"screenshot-❌-1718105042591-(flow.yaml).png": 1000, "20991231235959.png": 500})
+            self.assertEqual(enrich.find_latest_screenshot(tmp).name, "screenshot-❌-1718105042591-(flow.yaml).png")
+
+
+if __name__ == "__main__":
+    unittest.main()